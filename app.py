@@ -1,107 +1,248 @@
-
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
-from datetime import datetime
-import smtplib
-from email.message import EmailMessage
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import collections
 import os
-import re
+import threading
+import time
 import traceback
 
-# Google Sheets setup
-# Restrict OAuth scope to spreadsheets only to follow least-privilege.
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets"
-]
+from hsw.email import is_valid_email, send_confirmation_email
+from hsw.google_sheets import ERROR_LOG_RANGE, get_errorlog_worksheet, get_existing_emails, get_worksheet
+
+# A1 range that signup rows are appended to (Name, Email, Timestamp).
+SIGNUP_RANGE = "Sheet1!A:C"
+
+ERROR_LOG_PATH = os.path.join("logs", "error.log")
+
+# Local-time format for signup and error-log timestamps.
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Innermost traceback frames kept in the ErrorLog sheet.
+TRACEBACK_FRAME_LIMIT = 20
+
+# Signups are buffered process-wide and appended in batches: as soon as this
+# many rows are pending, otherwise on the next interval tick.
+SIGNUP_FLUSH_BATCH_SIZE = 10
+SIGNUP_FLUSH_INTERVAL_SECONDS = 30
+# Hard cap on buffered rows; past this, submits are refused rather than queued
+# behind an outage.
+SIGNUP_BUFFER_MAX_SIZE = 500
+# Rows Sheets wouldn't take are moved here after this many consecutive failed
+# interval flushes (or at shutdown), and retried from here on later flushes.
+PENDING_SIGNUPS_PATH = os.path.join("logs", "pending_signups.tsv")
+SIGNUP_SPILL_AFTER_FAILURES = 3
+# How long the exit hook waits for an in-progress flush to finish.
+SIGNUP_EXIT_FLUSH_TIMEOUT_SECONDS = 10
+# Tabs and newlines would break the one-row-per-line fallback file.
+_TSV_UNSAFE = str.maketrans("\t\r\n", "   ")
+
+# Email sends and error logging run off the script thread so the page
+# renders without waiting on SMTP or Sheets.
+@st.cache_resource(show_spinner=False)
+def get_background_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=4)
 
-import json
-import base64
 
-# Lazily initialize clients and worksheet with caching to avoid re-auth on every rerun.
 @st.cache_resource(show_spinner=False)
-def get_gspread_client() -> gspread.client.Client:
-    encoded_key = None
-    try:
-        encoded_key = st.secrets["gcp"]["encoded_key"]
-    except Exception:
-        # Fallback to environment variable to improve local dev experience
-        encoded_key = os.environ.get("GCP_ENCODED_KEY")
-    if not encoded_key:
-        raise RuntimeError("Missing GCP service account key. Set 'gcp.encoded_key' in secrets or GCP_ENCODED_KEY env var.")
+def get_signup_buffer() -> collections.deque:
+    return collections.deque()
 
-    decoded = base64.b64decode(encoded_key).decode("utf-8")
-    service_account_info = json.loads(decoded)
-    creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPE)
-    return gspread.authorize(creds)
+
+@st.cache_resource(show_spinner=False)
+def get_signup_flush_event() -> threading.Event:
+    return threading.Event()
 
 
 @st.cache_resource(show_spinner=False)
-def get_spreadsheet() -> gspread.models.Spreadsheet:  # type: ignore[valid-type]
-    sheet_url = None
-    try:
-        sheet_url = st.secrets.get("gcp", {}).get("sheet_url")  # type: ignore[attr-defined]
-    except Exception:
-        sheet_url = None
-    if not sheet_url:
-        sheet_url = os.environ.get("SHEET_URL")
-    if not sheet_url:
-        raise RuntimeError("Missing Google Sheet URL. Set 'gcp.sheet_url' in secrets or SHEET_URL env var.")
+def get_signup_flush_failing() -> threading.Event:
+    """Set while the last flush failed; early flushes stay off until one succeeds."""
+    return threading.Event()
+
+
+@st.cache_resource(show_spinner=False)
+def get_signup_flush_lock() -> threading.Lock:
+    """Serialises flushes and spills between the flusher thread and the exit hook."""
+    return threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def get_signup_inflight() -> list:
+    """Rows of the values.append call in progress; they are in neither the buffer nor the sheet yet."""
+    return []
 
-    gc = get_gspread_client()
-    return gc.open_by_url(sheet_url)
+
+@st.cache_resource(show_spinner=False)
+def get_pending_signups_fd() -> int:
+    os.makedirs(os.path.dirname(PENDING_SIGNUPS_PATH), exist_ok=True)
+    return os.open(PENDING_SIGNUPS_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
 
 
 @st.cache_resource(show_spinner=False)
-def get_worksheet() -> gspread.models.Worksheet:
-    sh = get_spreadsheet()
-    return sh.worksheet("Sheet1")
+def start_signup_flusher() -> threading.Thread:
+    """Start the daemon thread that drains the signup buffer; runs once per process.
 
-def get_email_credentials() -> tuple[str, str]:
-    username = None
-    password = None
+    Rows left in the fallback file by an earlier process are picked up by the
+    first flush, which is triggered right away when there are any.
+    """
+    buffer = get_signup_buffer()
+    failing = get_signup_flush_failing()
+    wake = get_signup_flush_event()
+    thread = threading.Thread(
+        target=_signup_flush_loop,
+        args=(buffer, wake, failing),
+        name="hsw-signup-flush",
+        daemon=True,
+    )
+    thread.start()
+    if _read_pending_signups():
+        wake.set()
+    # The daemon thread dies with the process; write out whatever is still pending.
+    atexit.register(_flush_signup_buffer_at_exit, buffer, failing)
+    return thread
+
+
+def _drain(buffer: collections.deque) -> list[list[str]]:
+    rows = []
+    while True:
+        try:
+            rows.append(buffer.popleft())
+        except IndexError:
+            return rows
+
+
+def _read_pending_signups() -> list[list[str]]:
+    """Rows an earlier failed flush moved to the local fallback file, oldest first."""
     try:
-        username = st.secrets["email"]["username"]
-        password = st.secrets["email"]["password"]
-    except Exception:
-        username = os.environ.get("EMAIL_USERNAME")
-        password = os.environ.get("EMAIL_PASSWORD")
-    if not username or not password:
-        raise RuntimeError("Missing email credentials. Set email.username/password in secrets or EMAIL_USERNAME/EMAIL_PASSWORD env vars.")
-    return username, password
+        with open(PENDING_SIGNUPS_PATH, encoding="utf-8") as f:
+            return [line.rstrip("\n").split("\t") for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
 
 
-def is_valid_email(address: str) -> bool:
-    if not isinstance(address, str):
-        return False
-    address = address.strip()
-    if "\n" in address or "\r" in address:
-        return False
-    pattern = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
-    return re.match(pattern, address) is not None
+def _spill_signup_buffer(buffer: collections.deque) -> None:
+    """Move every buffered row to the fallback file so an outage or restart can't lose it.
 
+    Call with the flush lock held. If even the local write fails, the rows are
+    kept in memory and included in the error-log entry.
+    """
+    rows = _drain(buffer)
+    if not rows:
+        return
+    data = "".join("\t".join(field.translate(_TSV_UNSAFE) for field in row) + "\n" for row in rows)
+    try:
+        os.write(get_pending_signups_fd(), data.encode("utf-8"))
+    except Exception as e:
+        buffer.extendleft(reversed(rows))
+        log_error(f"Signups: could not save pending rows locally: {rows!r}", e, skip_sheets=True)
 
-def send_confirmation_email(name: str, recipient_email: str):
-    sender_email, sender_password = get_email_credentials()
-    msg = EmailMessage()
-    msg["Subject"] = "✅ You're in: High-Stakes Wealth Alerts"
-    msg["From"] = sender_email
-    msg["To"] = recipient_email
-    msg.set_content(f"""Hi {name},
 
-Thanks for signing up for High-Stakes Wealth alerts!
+def _flush_signup_buffer(buffer: collections.deque, failing: threading.Event) -> bool:
+    """Append the spilled and buffered signup rows with a single values.append call.
 
-You’ll now receive:
-- 📊 Weekly portfolio summaries
-- 🔔 Big price movement alerts (e.g. BTC drops 10%)
-- 🧠 New AI investment picks
+    Returns False if the append failed. Buffered rows are then back at the
+    front of the buffer and spilled rows stay in the fallback file, so the next
+    flush retries both in order. Until a flush succeeds, `failing` stays set so
+    new submits don't trigger retries.
+    """
+    with get_signup_flush_lock():
+        spilled = _read_pending_signups()
+        inflight = get_signup_inflight()
+        # Publish the rows as in flight before they leave the buffer, then pin
+        # the list to exactly what was drained.
+        inflight[:] = spilled + list(buffer)
+        rows = _drain(buffer)
+        inflight[:] = spilled + rows
+        if not inflight:
+            return True
+        try:
+            get_worksheet().spreadsheet.values_append(
+                SIGNUP_RANGE,
+                {"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+                {"values": spilled + rows},
+            )
+        except Exception as e:
+            buffer.extendleft(reversed(rows))
+            failing.set()
+            log_error(f"Sheets: append {len(spilled) + len(rows)} signup rows", e, skip_sheets=True)
+            return False
+        else:
+            if spilled:
+                os.truncate(PENDING_SIGNUPS_PATH, 0)
+            # The cached sheet snapshot predates these rows; drop it before they
+            # leave the in-flight list so dedup never loses sight of them.
+            get_existing_emails.clear()
+            failing.clear()
+            return True
+        finally:
+            inflight.clear()
+
+
+def _signup_flush_loop(buffer: collections.deque, wake: threading.Event, failing: threading.Event) -> None:
+    failures = 0
+    while True:
+        wake.wait(timeout=SIGNUP_FLUSH_INTERVAL_SECONDS)
+        wake.clear()
+        if _flush_signup_buffer(buffer, failing):
+            failures = 0
+            continue
+        failures += 1
+        if failures >= SIGNUP_SPILL_AFTER_FAILURES:
+            with get_signup_flush_lock():
+                _spill_signup_buffer(buffer)
+
+
+def _flush_signup_buffer_at_exit(buffer: collections.deque, failing: threading.Event) -> None:
+    """Last flush at shutdown; rows Sheets still won't take go to the fallback file."""
+    lock = get_signup_flush_lock()
+    # Let an in-progress flush finish so its rows are either written or back in the buffer.
+    if not lock.acquire(timeout=SIGNUP_EXIT_FLUSH_TIMEOUT_SECONDS):
+        # That flush is stuck on Sheets; save what is still buffered without it.
+        _spill_signup_buffer(buffer)
+        return
+    lock.release()
+    if not _flush_signup_buffer(buffer, failing):
+        with lock:
+            _spill_signup_buffer(buffer)
+
+
+def queue_signup(name: str, email: str, timestamp: str) -> None:
+    """Buffer a signup row; the flusher appends it with the rest of its batch.
+
+    Raises RuntimeError when the buffer is full (Sheets has been failing), so
+    the caller reports the failure instead of a success.
+    """
+    start_signup_flusher()
+    buffer = get_signup_buffer()
+    if len(buffer) >= SIGNUP_BUFFER_MAX_SIZE:
+        raise RuntimeError(f"Signup buffer full ({SIGNUP_BUFFER_MAX_SIZE} rows pending)")
+    buffer.append([name, email, timestamp])
+    if len(buffer) >= SIGNUP_FLUSH_BATCH_SIZE and not get_signup_flush_failing().is_set():
+        get_signup_flush_event().set()
 
-Stay bold,
-The High-Stakes Wealth Team
-""")
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(sender_email, sender_password)
-        smtp.send_message(msg)
+
+# One O_APPEND descriptor per process: each log line is a single write(2),
+# which POSIX appends atomically, instead of an open/write/close per error.
+@st.cache_resource(show_spinner=False)
+def get_error_log_fd() -> int:
+    os.makedirs(os.path.dirname(ERROR_LOG_PATH), exist_ok=True)
+    return os.open(ERROR_LOG_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+
+def is_already_subscribed(email: str) -> bool:
+    """Check signups not yet in the sheet, then the cached sheet emails; if the read fails, allow the signup through."""
+    key = email.lower()
+    # Rows still buffered, being appended, or spilled to the fallback file
+    # aren't in the sheet snapshot yet. Copy the buffer and in-flight list
+    # first since the flusher may be changing them concurrently.
+    pending = list(get_signup_buffer()) + list(get_signup_inflight()) + _read_pending_signups()
+    if any(len(row) > 1 and row[1].lower() == key for row in pending):
+        return True
+    try:
+        return key in get_existing_emails()
+    except Exception as e:
+        log_error("Sheets: read existing emails", e, skip_sheets=True)
+        return False
 
 
 def _append_error_log_to_file(error_context: str, error: Exception) -> None:
@@ -110,14 +251,12 @@ def _append_error_log_to_file(error_context: str, error: Exception) -> None:
     This function must never raise.
     """
     try:
-        logs_path = os.path.join("logs", "error.log")
-        os.makedirs(os.path.dirname(logs_path), exist_ok=True)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = time.strftime(TIMESTAMP_FORMAT)
         error_type = type(error).__name__
         # Keep the file log single-line per entry for easier grepping
         tb = " ".join(traceback.format_exception_only(type(error), error)).strip()
-        with open(logs_path, "a", encoding="utf-8") as f:
-            f.write(f"{timestamp}\t{error_context}\t{error_type}\t{str(error)}\t{tb}\n")
+        line = f"{timestamp}\t{error_context}\t{error_type}\t{str(error)}\t{tb}\n"
+        os.write(get_error_log_fd(), line.encode("utf-8"))
     except Exception:
         # Final fallback: swallow to avoid surfacing logging issues to users
         pass
@@ -129,31 +268,30 @@ def _append_error_log_to_sheets(error_context: str, error: Exception) -> bool:
     This function should not raise; it returns False if anything goes wrong.
     """
     try:
-        sh = get_spreadsheet()
-        try:
-            ws = sh.worksheet("ErrorLog")
-        except gspread.exceptions.WorksheetNotFound:
-            ws = sh.add_worksheet(title="ErrorLog", rows=100, cols=6)
-            ws.append_row(["Timestamp", "Context", "ErrorType", "Message", "Traceback"])
+        ws = get_errorlog_worksheet()
 
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = time.strftime(TIMESTAMP_FORMAT)
         error_type = type(error).__name__
-        # Traceback can be long; cap to a reasonable size for a single cell
-        tb = "".join(traceback.format_exception(type(error), error, error.__traceback__))
-        if len(tb) > 25000:
-            tb = tb[:25000] + "\n… (truncated)"
-        ws.append_row([timestamp, error_context, error_type, str(error), tb])
+        # Only the innermost frames are extracted, so deep (e.g. recursive)
+        # tracebacks cost O(limit) to format and stay well inside one cell.
+        frames = traceback.extract_tb(error.__traceback__, limit=-TRACEBACK_FRAME_LIMIT)
+        tb = "".join(
+            ["Traceback (most recent call last):\n"]
+            + traceback.format_list(frames)
+            + traceback.format_exception_only(type(error), error)
+        )
+        # Append straight to the values endpoint; skips gspread's extra table lookup.
+        ws.spreadsheet.values_append(
+            ERROR_LOG_RANGE,
+            {"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+            {"values": [[timestamp, error_context, error_type, str(error), tb]]},
+        )
         return True
     except Exception:
         return False
 
 
-def log_error(error_context: str, error: Exception, *, skip_sheets: bool = False) -> None:
-    """Best-effort error logging to Sheets and/or local file.
-
-    - If skip_sheets is True, only write to file (useful when the Sheets operation failed).
-    - Otherwise, attempt Sheets first, then fall back to file.
-    """
+def _write_error_log(error_context: str, error: Exception, skip_sheets: bool) -> None:
     try:
         wrote_to_sheets = False
         if not skip_sheets:
@@ -164,6 +302,33 @@ def log_error(error_context: str, error: Exception, *, skip_sheets: bool = False
         # Never let logging raise
         pass
 
+
+def log_error(error_context: str, error: Exception, *, skip_sheets: bool = False) -> None:
+    """Best-effort error logging to Sheets and/or local file, on the background executor.
+
+    - If skip_sheets is True, only write to file (useful when the Sheets operation failed).
+    - Otherwise, attempt Sheets first, then fall back to file.
+    - If the executor is unavailable, log inline instead.
+    """
+    try:
+        get_background_executor().submit(_write_error_log, error_context, error, skip_sheets)
+    except Exception:
+        _write_error_log(error_context, error, skip_sheets)
+
+
+def _send_confirmation_email_task(name: str, recipient_email: str) -> None:
+    """Send the confirmation email, logging failures before re-raising them onto the future."""
+    try:
+        send_confirmation_email(name, recipient_email)
+    except Exception as e:
+        log_error("Email: send confirmation", e)
+        raise
+
+
+# Start the flusher on first load so signups left in the fallback file by a
+# previous process are retried without waiting for a new submit.
+start_signup_flusher()
+
 # Streamlit form
 st.title("📬 Sign Up for High-Stakes Wealth Alerts")
 st.write("Join our insider list to get:")
@@ -171,6 +336,13 @@ st.markdown("""• 📊 Weekly portfolio summaries
 • 🔔 Price movement alerts  
 • 🧠 New AI investment picks""")
 
+# Surface the outcome of an email sent on a previous run once it has finished.
+email_future = st.session_state.get("email_future")
+if email_future is not None and email_future.done():
+    del st.session_state["email_future"]
+    if email_future.exception() is not None:
+        st.toast("We couldn't send your confirmation email.", icon="⚠️")
+
 with st.form("signup_form", clear_on_submit=True):
     input_name = st.text_input("Your Name")
     input_email = st.text_input("Your Email")
@@ -184,19 +356,22 @@ with st.form("signup_form", clear_on_submit=True):
             st.error("Please fill in both name and email.")
         elif not is_valid_email(email):
             st.error("Please enter a valid email address.")
+        elif is_already_subscribed(email):
+            st.info("You're already subscribed.")
         else:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            now = time.strftime(TIMESTAMP_FORMAT)
             try:
-                worksheet = get_worksheet()
-                worksheet.append_row([name, email, now])
+                queue_signup(name, email, now)
             except Exception as e:
-                log_error("Sheets: append signup row", e, skip_sheets=True)
+                log_error("Sheets: queue signup row", e, skip_sheets=True)
                 st.error("We couldn't save your signup right now. Please try again shortly.")
             else:
                 try:
-                    send_confirmation_email(name, email)
+                    st.session_state["email_future"] = get_background_executor().submit(
+                        _send_confirmation_email_task, name, email
+                    )
                 except Exception as e:
-                    log_error("Email: send confirmation", e)
+                    log_error("Email: queue confirmation", e)
                     st.warning("You're added, but we couldn't send the confirmation email.")
                 else:
-                    st.success("✅ You’ve been added and a confirmation email has been sent!")
+                    st.success("✅ You’ve been added — your confirmation email is on its way!")
@@ -1,13 +1,30 @@
 from __future__ import annotations
 
 import argparse
+import os
+import re
+import time
 from dataclasses import dataclass
 from datetime import datetime, date
+from pathlib import Path
 from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the plain NumPy loop is used instead
+    njit = None
+
+
+# Downloaded price histories are cached on disk so re-runs and parameter sweeps
+# skip the network. Override with HSW_CACHE_DIR / HSW_CACHE_TTL_SECONDS.
+PRICE_CACHE_DIR = Path(os.environ.get("HSW_CACHE_DIR", Path.home() / ".cache" / "hsw"))
+PRICE_CACHE_TTL_SECONDS = float(os.environ.get("HSW_CACHE_TTL_SECONDS", 86_400))
+
+# Newer pandas only accepts the end-anchored spellings of the CLI's aliases.
+_OFFSET_ALIASES = {"M": "ME", "Q": "QE", "A": "YE", "Y": "YE"}
 
 
 @dataclass
@@ -29,69 +46,133 @@ class BacktestResult:
     metrics: BacktestMetrics
 
 
-def _download_adj_close(
-    ticker: str,
+def _price_cache_path(stock_ticker: str, crypto_ticker: str, start_date: str, end_date: Optional[str]) -> Path:
+    key = f"{stock_ticker}_{crypto_ticker}_{start_date}_{end_date}"
+    return PRICE_CACHE_DIR / (re.sub(r"[^A-Za-z0-9._-]", "_", key) + ".csv")
+
+
+def _read_price_cache(path: Path) -> Optional[pd.DataFrame]:
+    """Return the cached prices if they exist and are younger than the TTL, else None.
+
+    The cache is plain CSV so a file planted in the cache directory can only
+    ever be data, never code.
+    """
+    try:
+        if time.time() - path.stat().st_mtime > PRICE_CACHE_TTL_SECONDS:
+            return None
+        prices = pd.read_csv(path, index_col=0, parse_dates=True, float_precision="round_trip")
+    except Exception:
+        return None
+    if list(prices.columns) != ["stock", "crypto"] or not isinstance(prices.index, pd.DatetimeIndex):
+        return None
+    return prices
+
+
+def _write_price_cache(path: Path, prices: pd.DataFrame) -> None:
+    # Best effort: a read-only or full disk only costs the next run a re-download.
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        prices.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        pass
+
+
+# In-process memo of (loaded_at, prices), oldest first; entries expire with the
+# same TTL as the disk cache so long-lived importers still refresh.
+_PRICE_MEMO: dict = {}
+_PRICE_MEMO_MAX_SIZE = 32
+
+
+def _download_prices(
+    stock_ticker: str,
+    crypto_ticker: str,
     start_date: str,
     end_date: Optional[str],
-) -> pd.Series:
-    data = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=False)
-    if data is None or (hasattr(data, "empty") and data.empty):
-        raise RuntimeError(f"No data returned for {ticker} between {start_date} and {end_date}.")
-
-    # Select adjusted close or close
-    selected = None
-    if isinstance(data, pd.DataFrame):
-        if "Adj Close" in data.columns:
-            selected = data["Adj Close"]
-        elif "Close" in data.columns:
-            selected = data["Close"]
-        else:
-            # fallback: first numeric column
-            numeric_df = data.select_dtypes(include=[np.number])
-            if numeric_df.shape[1] >= 1:
-                selected = numeric_df.iloc[:, 0]
-            else:
-                raise RuntimeError(f"Unable to find price column for {ticker}.")
-    else:
-        # Already a Series
-        selected = data
-
-    # If still a DataFrame (e.g., MultiIndex columns or single-level with 1+ columns), reduce to a Series
-    if isinstance(selected, pd.DataFrame):
-        # Try to pick the column that matches the ticker
-        if isinstance(selected.columns, pd.MultiIndex):
-            series_candidate = None
-            for col in selected.columns:
-                try:
-                    # col may be tuple like ("Adj Close", "BTC-USD")
-                    if isinstance(col, tuple) and any(str(ticker) == str(part) for part in col):
-                        series_candidate = selected[col]
-                        break
-                except Exception:
-                    continue
-            if series_candidate is None:
-                # fallback to first column
-                series_candidate = selected.iloc[:, 0]
-            series = pd.Series(series_candidate)
-        else:
-            # Single-level columns
-            if ticker in selected.columns:
-                series = selected[ticker]
-            else:
-                # fallback to first column
-                series = selected.iloc[:, 0]
-    else:
-        series = selected
+) -> pd.DataFrame:
+    """Aligned 'stock'/'crypto' prices, memoized in-process and cached on disk for a day.
 
-    if not isinstance(series, pd.Series):
-        series = pd.Series(series)
+    The returned frame is shared between callers; treat it as read-only.
+    """
+    key = (stock_ticker, crypto_ticker, start_date, end_date)
+    memo = _PRICE_MEMO.pop(key, None)
+    if memo is not None and time.time() - memo[0] <= PRICE_CACHE_TTL_SECONDS:
+        _PRICE_MEMO[key] = memo
+        return memo[1]
+
+    path = _price_cache_path(stock_ticker, crypto_ticker, start_date, end_date)
+    prices = _read_price_cache(path)
+    if prices is None:
+        prices = _fetch_prices(stock_ticker, crypto_ticker, start_date, end_date)
+        _write_price_cache(path, prices)
+
+    _PRICE_MEMO[key] = (time.time(), prices)
+    while len(_PRICE_MEMO) > _PRICE_MEMO_MAX_SIZE:
+        del _PRICE_MEMO[next(iter(_PRICE_MEMO))]
+    return prices
+
+
+def _fetch_prices(
+    stock_ticker: str,
+    crypto_ticker: str,
+    start_date: str,
+    end_date: Optional[str],
+) -> pd.DataFrame:
+    # Imported here so --help and callers that only reuse the metrics helpers
+    # don't pay yfinance's import cost.
+    import yfinance as yf
+
+    # One request for both tickers; yfinance fetches them concurrently and
+    # returns them side by side under a (ticker, field) column MultiIndex.
+    data = yf.download(
+        [stock_ticker, crypto_ticker],
+        start=start_date,
+        end=end_date,
+        progress=False,
+        auto_adjust=False,
+        group_by="ticker",
+        threads=True,
+    )
+    if data is None or data.empty:
+        raise RuntimeError(
+            f"No data returned for {stock_ticker}/{crypto_ticker} between {start_date} and {end_date}."
+        )
+
+    # Keep only dates where both assets have a price
+    prices = pd.concat(
+        [
+            _select_price_column(data, stock_ticker).rename("stock"),
+            _select_price_column(data, crypto_ticker).rename("crypto"),
+        ],
+        axis=1,
+    ).dropna()
+    # yfinance already returns a sorted DatetimeIndex; only convert/sort if it didn't
+    if not isinstance(prices.index, pd.DatetimeIndex):
+        prices.index = pd.to_datetime(prices.index)
+    if not prices.index.is_monotonic_increasing:
+        prices = prices.sort_index()
+    return prices
 
-    series.name = ticker
-    series = series[~pd.isna(series)]
-    # Ensure DatetimeIndex
-    series.index = pd.to_datetime(series.index)
-    series = series.sort_index()
-    return series
+
+def _select_price_column(data: pd.DataFrame, ticker: str) -> pd.Series:
+    """Pick the adjusted close (or close) for ticker from a group_by='ticker' download.
+
+    With auto_adjust=False yfinance always returns both columns, so only a
+    missing 'Adj Close' needs a fallback.
+    """
+    try:
+        frame = data[ticker]
+    except KeyError:
+        raise RuntimeError(f"No data returned for {ticker}.") from None
+    try:
+        return frame["Adj Close"]
+    except KeyError:
+        pass
+    try:
+        return frame["Close"]
+    except KeyError:
+        raise RuntimeError(f"Unable to find price column for {ticker}.") from None
 
 
 def _compute_metrics(portfolio_value: pd.Series, daily_returns: pd.Series, initial_capital: float, num_rebalances: int) -> BacktestMetrics:
@@ -110,26 +191,30 @@ def _compute_metrics(portfolio_value: pd.Series, daily_returns: pd.Series, initi
     years = max(num_days / 365.25, 1e-9)
     cagr = (final_value / float(initial_capital)) ** (1.0 / years) - 1.0
 
-    # Annualized volatility and Sharpe (rf = 0)
+    # Annualized volatility and Sharpe (rf = 0): mean daily return over its
+    # standard deviation, both scaled to a year of trading days.
     trading_days_per_year = 252.0
-    daily_returns = daily_returns.dropna()
-    if len(daily_returns) > 1:
-        annual_volatility = float(daily_returns.std(ddof=1)) * np.sqrt(trading_days_per_year)
-        sharpe_ratio = (1.0 + daily_returns.mean()) ** trading_days_per_year - 1.0
-        if annual_volatility > 0:
-            sharpe_ratio = sharpe_ratio / annual_volatility
+    returns = daily_returns.dropna().to_numpy(dtype=np.float64)
+    if returns.size > 1:
+        daily_std = float(returns.std(ddof=1))
+        annual_volatility = daily_std * np.sqrt(trading_days_per_year)
+        if daily_std > 0:
+            sharpe_ratio = float(returns.mean()) * np.sqrt(trading_days_per_year) / daily_std
         else:
             sharpe_ratio = 0.0
     else:
         annual_volatility = 0.0
         sharpe_ratio = 0.0
 
-    # Max drawdown
-    running_max = portfolio_value.cummax()
-    drawdown = (portfolio_value / running_max) - 1.0
-    max_drawdown = float(drawdown.min())
-    mdd_end = drawdown.idxmin()
-    mdd_start = portfolio_value.loc[:mdd_end].idxmax()
+    # Max drawdown; the peak is the first maximum up to the trough
+    values = portfolio_value.to_numpy(dtype=np.float64)
+    running_max = np.maximum.accumulate(values)
+    drawdown = (values / running_max) - 1.0
+    end_pos = int(drawdown.argmin())
+    start_pos = int(values[: end_pos + 1].argmax())
+    max_drawdown = float(drawdown[end_pos])
+    mdd_end = portfolio_value.index[end_pos]
+    mdd_start = portfolio_value.index[start_pos]
 
     return BacktestMetrics(
         total_return=float(total_return),
@@ -144,6 +229,81 @@ def _compute_metrics(portfolio_value: pd.Series, daily_returns: pd.Series, initi
     )
 
 
+def _simulate_units_py(
+    price_stock: np.ndarray,
+    price_crypto: np.ndarray,
+    rebal_mask: np.ndarray,
+    initial_capital: float,
+    stock_weight: float,
+    crypto_weight: float,
+    fee_bps: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return per-day units held, walking only the rebalance days.
+
+    Holdings are constant between rebalances, so each rebalance fills the
+    following segment of the unit arrays in one slice assignment.
+    """
+    n = price_stock.size
+    units_stock_arr = np.empty(n)
+    units_crypto_arr = np.empty(n)
+    rebal_idx = np.flatnonzero(rebal_mask)
+    fee_rate = fee_bps / 10_000.0
+
+    units_stock = 0.0
+    units_crypto = 0.0
+    for k in range(rebal_idx.size):
+        i = rebal_idx[k]
+        p_stock = price_stock[i]
+        p_crypto = price_crypto[i]
+
+        # Investable value: initial capital on the first day, otherwise pre-trade portfolio value
+        if i == 0:
+            investable_value_before_fees = initial_capital
+        else:
+            investable_value_before_fees = units_stock * p_stock + units_crypto * p_crypto
+
+        # Estimate traded notional from the pre-fee target units
+        trade_units_stock = (investable_value_before_fees * stock_weight) / p_stock - units_stock
+        trade_units_crypto = (investable_value_before_fees * crypto_weight) / p_crypto - units_crypto
+        traded_notional = abs(trade_units_stock) * p_stock + abs(trade_units_crypto) * p_crypto
+        transaction_cost = traded_notional * fee_rate
+
+        # After fees, set units to hit target weights on net value
+        investable_value_after_fees = investable_value_before_fees - transaction_cost
+        if investable_value_after_fees < 0:
+            raise RuntimeError(
+                "Transaction costs exceeded portfolio value. Check fee_bps or data integrity."
+            )
+
+        units_stock = (investable_value_after_fees * stock_weight) / p_stock
+        units_crypto = (investable_value_after_fees * crypto_weight) / p_crypto
+
+        end = rebal_idx[k + 1] if k + 1 < rebal_idx.size else n
+        units_stock_arr[i:end] = units_stock
+        units_crypto_arr[i:end] = units_crypto
+
+    return units_stock_arr, units_crypto_arr
+
+
+# Compiled when numba is installed; cache=True keeps the machine code on disk so
+# repeated CLI runs skip the JIT warm-up. fastmath is left off so both paths
+# produce identical numbers.
+_simulate_units = njit(cache=True)(_simulate_units_py) if njit is not None else _simulate_units_py
+
+
+def _rebalance_offset(rebalance_frequency: str) -> pd.DateOffset:
+    """Parse a pandas frequency string, accepting the short 'M'/'Q'/'A' aliases on any pandas version."""
+    candidates = (_OFFSET_ALIASES.get(rebalance_frequency), rebalance_frequency)
+    for candidate in candidates:
+        if candidate is None:
+            continue
+        try:
+            return pd.tseries.frequencies.to_offset(candidate)
+        except ValueError:
+            continue
+    raise ValueError(f"Unsupported rebalance_frequency: {rebalance_frequency!r}")
+
+
 def backtest_75_25(
     start_date: str = "2015-01-01",
     end_date: Optional[str] = None,
@@ -160,7 +320,7 @@ def backtest_75_25(
 
     Assumptions:
     - Default target weights are 75% stocks, 25% BTC. Configure via stock_weight/crypto_weight.
-    - Rebalance at period end for the provided pandas frequency string (default monthly).
+    - Rebalance on the last trading day of each period for the provided pandas frequency string (default monthly).
     - Transaction costs applied on traded notional per rebalance (fee_bps per leg).
     - Uses yfinance adjusted close where available; otherwise falls back to close.
     - Days where either asset lacks prices are excluded to align calendars.
@@ -171,94 +331,61 @@ def backtest_75_25(
     if end_date is None:
         end_date = date.today().isoformat()
 
-    stock_prices = _download_adj_close(stock_ticker, start_date, end_date)
-    crypto_prices = _download_adj_close(crypto_ticker, start_date, end_date)
-
-    # Align on common dates only (both have prices)
-    prices = pd.concat(
-        [stock_prices.to_frame(name="stock"), crypto_prices.to_frame(name="crypto")], axis=1
-    ).dropna()
+    # Aligned on common dates only (both have prices)
+    prices = _download_prices(stock_ticker, crypto_ticker, start_date, end_date)
 
     if prices.empty or len(prices) < 2:
         raise RuntimeError("Insufficient overlapping price history for the two tickers.")
 
-    # Determine rebalance dates (period end)
-    rebalance_dates = prices.resample(rebalance_frequency).last().index
-
-    portfolio_records = []
-
-    units_stock: float = 0.0
-    units_crypto: float = 0.0
-    current_portfolio_value: float = 0.0
-
-    num_rebalances: int = 0
-
-    for idx, (timestamp, row) in enumerate(prices.iterrows()):
-        price_stock = float(row["stock"])
-        price_crypto = float(row["crypto"])
-
-        # Portfolio value before any trades for the day
-        value_stock = units_stock * price_stock
-        value_crypto = units_crypto * price_crypto
-        current_portfolio_value = value_stock + value_crypto
-
-        is_first_day = idx == 0
-        is_rebalance_day = (timestamp in rebalance_dates) or is_first_day
-
-        if is_rebalance_day:
-            num_rebalances += 1
-            # Determine investable value (initial capital on first day; otherwise current portfolio value)
-            investable_value_before_fees = initial_capital if is_first_day else current_portfolio_value
-
-            # Compute desired units before fee adjustment to estimate traded notional
-            desired_value_stock = investable_value_before_fees * stock_weight
-            desired_value_crypto = investable_value_before_fees * crypto_weight
-            desired_units_stock = desired_value_stock / price_stock
-            desired_units_crypto = desired_value_crypto / price_crypto
-
-            trade_units_stock = desired_units_stock - units_stock
-            trade_units_crypto = desired_units_crypto - units_crypto
-
-            traded_notional = (
-                abs(trade_units_stock) * price_stock + abs(trade_units_crypto) * price_crypto
-            )
-            transaction_cost = traded_notional * (fee_bps / 10_000.0)
-
-            # After fees, set units to hit target weights on net value
-            investable_value_after_fees = investable_value_before_fees - transaction_cost
-            if investable_value_after_fees < 0:
-                raise RuntimeError(
-                    "Transaction costs exceeded portfolio value. Check fee_bps or data integrity."
-                )
-
-            units_stock = (investable_value_after_fees * stock_weight) / price_stock
-            units_crypto = (investable_value_after_fees * crypto_weight) / price_crypto
-
-            # Update values post-rebalance
-            value_stock = units_stock * price_stock
-            value_crypto = units_crypto * price_crypto
-            current_portfolio_value = value_stock + value_crypto
-
-        weight_stock_realized = value_stock / current_portfolio_value if current_portfolio_value > 0 else 0.0
-        weight_crypto_realized = value_crypto / current_portfolio_value if current_portfolio_value > 0 else 0.0
-
-        portfolio_records.append(
-            {
-                "date": timestamp,
-                "price_stock": price_stock,
-                "price_crypto": price_crypto,
-                "units_stock": units_stock,
-                "units_crypto": units_crypto,
-                "value_stock": value_stock,
-                "value_crypto": value_crypto,
-                "portfolio_value": current_portfolio_value,
-                "is_rebalance": bool(is_rebalance_day),
-                "weight_stock": weight_stock_realized,
-                "weight_crypto": weight_crypto_realized,
-            }
-        )
-
-    portfolio = pd.DataFrame.from_records(portfolio_records).set_index("date").sort_index()
+    # Rebalance on the last trading day of each period. Resampling only the
+    # dates finds each period's last day without building a resampled frame.
+    period_last = prices.index.to_series().resample(_rebalance_offset(rebalance_frequency)).max().dropna()
+    rebal_mask = prices.index.isin(period_last.to_numpy())
+    # The final period may still be running (end_date defaults to today). It is
+    # finished once its calendar end label falls before the exclusive end_date,
+    # even if that label is a weekend or holiday with no row of its own.
+    if period_last.index[-1] >= pd.Timestamp(end_date):
+        rebal_mask[-1] = False
+    # The first day always (re)balances
+    rebal_mask[0] = True
+
+    price_stock = prices["stock"].to_numpy(dtype=np.float64)
+    price_crypto = prices["crypto"].to_numpy(dtype=np.float64)
+
+    units_stock, units_crypto = _simulate_units(
+        price_stock,
+        price_crypto,
+        rebal_mask,
+        float(initial_capital),
+        stock_weight,
+        crypto_weight,
+        fee_bps,
+    )
+    num_rebalances = int(rebal_mask.sum())
+
+    # Units are constant between rebalances, so daily values are one vector multiply.
+    # Kept in float64: the arrays are small enough that float32 saves nothing
+    # measurable, and the portfolio frame / CSV output should stay exact.
+    value_stock = units_stock * price_stock
+    value_crypto = units_crypto * price_crypto
+    portfolio_value = value_stock + value_crypto
+    has_value = portfolio_value > 0
+
+    portfolio = pd.DataFrame(
+        {
+            "price_stock": price_stock,
+            "price_crypto": price_crypto,
+            "units_stock": units_stock,
+            "units_crypto": units_crypto,
+            "value_stock": value_stock,
+            "value_crypto": value_crypto,
+            "portfolio_value": portfolio_value,
+            "is_rebalance": rebal_mask,
+            "weight_stock": np.divide(value_stock, portfolio_value, out=np.zeros_like(portfolio_value), where=has_value),
+            "weight_crypto": np.divide(value_crypto, portfolio_value, out=np.zeros_like(portfolio_value), where=has_value),
+        },
+        index=prices.index.rename("date"),
+    )
     daily_returns = portfolio["portfolio_value"].pct_change()
 
     metrics = _compute_metrics(
@@ -0,0 +1 @@
+"""Shared Google Sheets and email helpers for the High-Stakes Wealth apps."""
@@ -0,0 +1,154 @@
+import os
+import queue
+import re
+import smtplib
+import string
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Iterator
+
+import streamlit as st
+
+# Compiled once per process. \Z (unlike $) rejects a trailing newline, and the
+# character classes already exclude CR/LF, so header injection cannot pass.
+_EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\Z")
+
+# Longest address RFC 5321 allows in a forward-path.
+MAX_EMAIL_LENGTH = 254
+
+# Keep-alive SMTP sessions: at most this many idle, each dropped after TTL.
+SMTP_POOL_MAX_SIZE = 5
+SMTP_IDLE_TTL_SECONDS = 500
+
+CONFIRMATION_SUBJECT = "✅ You're in: High-Stakes Wealth Alerts"
+_CONFIRMATION_BODY = string.Template("""Hi $name,
+
+Thanks for signing up for High-Stakes Wealth alerts!
+
+You’ll now receive:
+- 📊 Weekly portfolio summaries
+- 🔔 Big price movement alerts (e.g. BTC drops 10%)
+- 🧠 New AI investment picks
+
+Stay bold,
+The High-Stakes Wealth Team
+""")
+
+# One confirmation message per worker thread; only To and the body change per send.
+_message_local = threading.local()
+
+
+def get_email_credentials() -> tuple[str, str]:
+    username = None
+    password = None
+    try:
+        username = st.secrets["email"]["username"]
+        password = st.secrets["email"]["password"]
+    except Exception:
+        username = os.environ.get("EMAIL_USERNAME")
+        password = os.environ.get("EMAIL_PASSWORD")
+    if not username or not password:
+        raise RuntimeError("Missing email credentials. Set email.username/password in secrets or EMAIL_USERNAME/EMAIL_PASSWORD env vars.")
+    return username, password
+
+
+def is_valid_email(address: str) -> bool:
+    if not isinstance(address, str):
+        return False
+    address = address.strip()
+    # Cheap rejects before the regex: empty, over-long, or not exactly one "@".
+    if not address or len(address) > MAX_EMAIL_LENGTH or address.count("@") != 1:
+        return False
+    return _EMAIL_RE.match(address) is not None
+
+
+@st.cache_resource(show_spinner=False)
+def get_smtp_pool() -> queue.Queue:
+    """Idle (smtp, last_used) pairs shared across reruns and sessions."""
+    return queue.Queue(maxsize=SMTP_POOL_MAX_SIZE)
+
+
+def _open_smtp() -> smtplib.SMTP_SSL:
+    sender_email, sender_password = get_email_credentials()
+    smtp = smtplib.SMTP_SSL("smtp.gmail.com", 465)
+    try:
+        smtp.login(sender_email, sender_password)
+    except Exception:
+        _close_smtp(smtp)
+        raise
+    return smtp
+
+
+def _close_smtp(smtp: smtplib.SMTP_SSL) -> None:
+    try:
+        smtp.quit()
+    except Exception:
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+
+def _checkout_smtp(pool: queue.Queue) -> smtplib.SMTP_SSL:
+    """Return a live pooled session, dropping stale ones; open a new one if none are left."""
+    while True:
+        try:
+            smtp, last_used = pool.get_nowait()
+        except queue.Empty:
+            return _open_smtp()
+        if time.monotonic() - last_used > SMTP_IDLE_TTL_SECONDS:
+            _close_smtp(smtp)
+            continue
+        try:
+            if smtp.noop()[0] == 250:
+                return smtp
+        except Exception:
+            pass
+        _close_smtp(smtp)
+
+
+@contextmanager
+def borrow_smtp() -> Iterator[smtplib.SMTP_SSL]:
+    """Borrow a logged-in SMTP session from the pool.
+
+    The session goes back to the pool on success and is closed on error.
+    """
+    pool = get_smtp_pool()
+    smtp = _checkout_smtp(pool)
+    try:
+        yield smtp
+    except Exception:
+        _close_smtp(smtp)
+        raise
+    try:
+        pool.put_nowait((smtp, time.monotonic()))
+    except queue.Full:
+        _close_smtp(smtp)
+
+
+def _confirmation_message(sender_email: str) -> EmailMessage:
+    msg = getattr(_message_local, "msg", None)
+    if msg is None or msg["From"] != sender_email:
+        msg = EmailMessage()
+        msg["Subject"] = CONFIRMATION_SUBJECT
+        msg["From"] = sender_email
+        msg["To"] = sender_email  # placeholder, replaced on every send
+        _message_local.msg = msg
+    return msg
+
+
+def send_confirmation_email(name: str, recipient_email: str):
+    sender_email, _ = get_email_credentials()
+    msg = _confirmation_message(sender_email)
+    msg.replace_header("To", recipient_email)
+    msg.set_content(_CONFIRMATION_BODY.substitute(name=name))
+    try:
+        with borrow_smtp() as smtp:
+            smtp.send_message(msg)
+    except smtplib.SMTPServerDisconnected:
+        # A pooled session can still drop between its NOOP check and the send;
+        # borrow_smtp has closed it, so retry once on another session.
+        with borrow_smtp() as smtp:
+            smtp.send_message(msg)
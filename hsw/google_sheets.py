@@ -0,0 +1,112 @@
+import base64
+import os
+import threading
+
+import gspread
+import orjson
+import streamlit as st
+from google.oauth2.service_account import Credentials
+
+from hsw.email import borrow_smtp
+
+# Restrict OAuth scope to spreadsheets only to follow least-privilege.
+SCOPE = [
+    "https://www.googleapis.com/auth/spreadsheets"
+]
+
+ERROR_LOG_TITLE = "ErrorLog"
+ERROR_LOG_RANGE = f"{ERROR_LOG_TITLE}!A:E"
+ERROR_LOG_HEADER = ["Timestamp", "Context", "ErrorType", "Message", "Traceback"]
+
+
+# Lazily initialize clients and worksheet with caching to avoid re-auth on every rerun.
+@st.cache_resource(show_spinner=False)
+def get_gspread_client() -> gspread.client.Client:
+    encoded_key = None
+    try:
+        encoded_key = st.secrets["gcp"]["encoded_key"]
+    except Exception:
+        # Fallback to environment variable to improve local dev experience
+        encoded_key = os.environ.get("GCP_ENCODED_KEY")
+    if not encoded_key:
+        raise RuntimeError("Missing GCP service account key. Set 'gcp.encoded_key' in secrets or GCP_ENCODED_KEY env var.")
+
+    # orjson parses the decoded bytes directly, skipping the str decode copy.
+    service_account_info = orjson.loads(base64.b64decode(encoded_key))
+    creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPE)
+    return gspread.authorize(creds)
+
+
+@st.cache_resource(show_spinner=False)
+def get_spreadsheet() -> gspread.models.Spreadsheet:  # type: ignore[valid-type]
+    sheet_url = None
+    try:
+        sheet_url = st.secrets.get("gcp", {}).get("sheet_url")  # type: ignore[attr-defined]
+    except Exception:
+        sheet_url = None
+    if not sheet_url:
+        sheet_url = os.environ.get("SHEET_URL")
+    if not sheet_url:
+        raise RuntimeError("Missing Google Sheet URL. Set 'gcp.sheet_url' in secrets or SHEET_URL env var.")
+
+    gc = get_gspread_client()
+    return gc.open_by_url(sheet_url)
+
+
+@st.cache_resource(show_spinner=False)
+def get_worksheet() -> gspread.models.Worksheet:
+    sh = get_spreadsheet()
+    return sh.worksheet("Sheet1")
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_existing_emails() -> frozenset[str]:
+    """Lower-cased emails already in the signup sheet, refreshed at most every 30 s.
+
+    Reads only column B through a single values.get range request.
+    """
+    ws = get_worksheet()
+    return frozenset(row[0].strip().lower() for row in ws.get("B2:B") if row and row[0])
+
+
+@st.cache_resource(show_spinner=False)
+def get_errorlog_worksheet() -> gspread.models.Worksheet:
+    """Return the 'ErrorLog' worksheet, creating it with a header row if missing.
+
+    Cached so the lookup/creation round-trips happen once per process.
+    """
+    sh = get_spreadsheet()
+    try:
+        return sh.worksheet(ERROR_LOG_TITLE)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = sh.add_worksheet(title=ERROR_LOG_TITLE, rows=100, cols=6)
+        ws.append_row(ERROR_LOG_HEADER)
+        return ws
+
+
+def _prewarm() -> None:
+    # Missing config or a network blip surfaces on first real use instead.
+    try:
+        get_worksheet()
+    except Exception:
+        pass
+    try:
+        # Opens one logged-in SMTP session (TLS + AUTH) and parks it in the pool.
+        with borrow_smtp():
+            pass
+    except Exception:
+        pass
+
+
+def start_prewarm() -> None:
+    """Fill the cached worksheet and SMTP pool on a daemon thread so the first submit finds them warm.
+
+    No-op outside a running Streamlit server (e.g. plain imports or scripts).
+    """
+    if not st.runtime.exists():
+        return
+    threading.Thread(target=_prewarm, name="hsw-prewarm", daemon=True).start()
+
+
+# Module import happens once per process, so this runs once per server.
+start_prewarm()